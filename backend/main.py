@@ -1,8 +1,12 @@
 from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+from typing import List
 import os
-from model import TenKAnalyzer
-import tempfile
+import asyncio
+import hashlib
+import diskcache
+from model import TenKAnalyzer, CACHE_TTL_SECONDS
 
 app = FastAPI()
 
@@ -22,20 +26,43 @@ api_key = os.getenv("DEEPSEEK_API_KEY")
 if not api_key:
     raise ValueError("DEEPSEEK_API_KEY environment variable is not set")
 
-analyzer = TenKAnalyzer(api_key)
+# Results are keyed by content hash, so re-submitting the same filing skips the whole pipeline
+cache = diskcache.Cache(os.getenv("TENK_CACHE_DIR", "/tmp/tenk-cache"))
 
-@app.post("/analyze")
+# The per-chunk map stage can run on a smaller/faster model (optionally on another
+# OpenAI-compatible provider) while the final reduce keeps the full model
+analyzer = TenKAnalyzer(
+    api_key,
+    cache=cache,
+    map_model=os.getenv("MAP_MODEL", "deepseek-chat"),
+    reduce_model=os.getenv("REDUCE_MODEL", "deepseek-chat"),
+    map_base_url=os.getenv("MAP_BASE_URL"),
+    map_api_key=os.getenv("MAP_API_KEY"),
+)
+
+class AnalysisReport(BaseModel):
+    """Response schema; lets FastAPI serialize through pydantic's compiled serializer."""
+    key_financial_metrics: List[str] = []
+    risks_and_challenges: List[str] = []
+    strategic_initiatives: List[str] = []
+    significant_changes: List[str] = []
+
+@app.post("/analyze", response_model=AnalysisReport)
 async def analyze_10k(file: UploadFile = File(...)):
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    # Starlette already spools large uploads to disk; read once and hand the bytes
+    # straight to PyMuPDF instead of round-tripping through our own temp file
+    content = await file.read()
+    
+    # Return the cached analysis for identical uploads
+    cache_key = f"analysis:{analyzer.cache_namespace}:{hashlib.sha256(content).hexdigest()}"
+    # diskcache calls block on SQLite (shared by all workers), so run them off the event loop
+    cached = await asyncio.to_thread(cache.get, cache_key)
+    if cached is not None:
+        return cached
     
-    try:
-        # Analyze the PDF
-        analysis = analyzer.analyze_10k(tmp_path)
-        return analysis
-    finally:
-        # Clean up temporary file
-        os.unlink(tmp_path)
\ No newline at end of file
+    # Analyze the PDF
+    analysis, complete = await analyzer.analyze_10k(content)
+    # Don't pin a degraded report (API outage, failed reduce) to this PDF for a day
+    if complete:
+        await asyncio.to_thread(cache.set, cache_key, analysis, expire=CACHE_TTL_SECONDS)
+    return analysis
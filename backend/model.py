@@ -1,11 +1,23 @@
 import os
-from PyPDF2 import PdfReader
+import re
+import asyncio
+import contextlib
+import hashlib
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pymupdf
+import numpy as np
 import tiktoken
-from openai import OpenAI
-import json
-from typing import List, Dict
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+import orjson
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
 import logging
 import dotenv
+from datasketch import MinHash, MinHashLSH
 
 # Load environment variables from .env file
 dotenv.load_dotenv()    
@@ -17,98 +29,378 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# PDFs shorter than this are extracted serially; process start-up would cost more than it saves
+PARALLEL_EXTRACTION_MIN_PAGES = 20
+# Cores are split between the server workers (gunicorn sets WEB_CONCURRENCY), leaving
+# one per worker for its event loop
+EXTRACTION_MAX_WORKERS = max(1, (os.cpu_count() or 2) // int(os.getenv("WEB_CONCURRENCY", "1")) - 1)
+
+# Bump whenever the analysis prompts change so cached results are not reused
+# (models and endpoints are part of TenKAnalyzer's cache namespaces)
+ANALYSIS_CACHE_VERSION = "v3"
+CACHE_TTL_SECONDS = 86400
+
+ANALYSIS_KEYS = (
+    "key_financial_metrics",
+    "risks_and_challenges",
+    "strategic_initiatives",
+    "significant_changes",
+)
+
+# Kept byte-identical across calls (nothing interpolated; the chunk goes only in the user
+# message) so the provider's prefix cache can reuse it for every chunk of a filing
+ANALYSIS_SYSTEM_PROMPT = """You are a concise financial analyst expert. Analyze the following 10-K filing excerpt and provide the MOST critical insights in pure JSON format (do not wrap in markdown code blocks). Use this exact structure:
+{
+    "key_financial_metrics": [],
+    "risks_and_challenges": [],
+    "strategic_initiatives": [],
+    "significant_changes": []
+}
+
+Be extremely selective and concise. Each array should contain only 3-5 of the MOST important points as strings. Focus on high-level, material insights that would be most relevant to investors. Each point should be a single sentence. Do not include any markdown formatting or code blocks in your response."""
+
+REDUCE_SYSTEM_PROMPT = """You are a concise financial analyst expert. You will receive JSON with insights extracted from separate excerpts of one 10-K filing, grouped by category. Merge duplicates and near-duplicates, and keep only the 5 most material points per category. Respond in pure JSON (do not wrap in markdown code blocks) with this exact structure:
+{
+    "key_financial_metrics": [],
+    "risks_and_challenges": [],
+    "strategic_initiatives": [],
+    "significant_changes": []
+}
+
+Each point should be a single sentence. Do not invent information that is not in the input."""
+
+# Boilerplate filtering: a line on more than this share of pages is a running header/footer
+REPEATED_LINE_PAGE_RATIO = 0.3
+REPEATED_LINE_MIN_PAGES = 10
+# Pages with a lower share of letters among non-space characters are treated as tables/XBRL.
+# Kept well below prose levels so the financial statements themselves survive.
+MIN_ALPHA_RATIO = 0.5
+SIGNATURES_RE = re.compile(r'^\s*SIGNATURES\s*$')
+# Headings that end the signature block; audited financial statements (F-pages) and
+# exhibits often follow the signatures
+SIGNATURE_BLOCK_END_RE = re.compile(
+    r'^\s*(F-1|INDEX TO (CONSOLIDATED )?FINANCIAL STATEMENTS|EXHIBIT INDEX|EXHIBITS)\s*$',
+    re.IGNORECASE,
+)
+
+# Chunks whose estimated Jaccard similarity over word 3-shingles reaches this are analyzed once
+DUPLICATE_CHUNK_THRESHOLD = 0.9
+MINHASH_NUM_PERM = 128
+
+# One extraction pool per server worker process, shared by all requests and created on
+# first use so it is started after gunicorn forks. It is first created from a to_thread
+# worker, so use forkserver rather than forking a multi-threaded process.
+_extraction_pool = None
+
+def _get_extraction_pool() -> ProcessPoolExecutor:
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _extraction_pool
+
+def _reset_extraction_pool() -> None:
+    """Drop a broken pool so the next _get_extraction_pool call starts a fresh one."""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _extraction_pool = None
+
+def _extract_page_range(pdf_bytes: bytes, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end). Runs in a worker process."""
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [doc[i].get_text("text") for i in range(start, end)]
+
+class AdaptiveConcurrencyLimiter:
+    """Async concurrency limit that adapts to the provider's rate limit (AIMD).
+    
+    The limit is halved when a call is rate limited and grows by one after a
+    streak of successful calls, never exceeding the configured maximum. A burst
+    of 429s counts as one congestion event: only calls admitted after the last
+    decrease can cut the limit again.
+    """
+
+    def __init__(self, max_concurrency: int, increase_after: int = 50):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.increase_after = increase_after
+        self._in_flight = 0
+        self._successes = 0
+        self._epoch = 0  # Incremented on every decrease
+        self._condition = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of an API call."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+            admitted_epoch = self._epoch
+        outcome = None
+        try:
+            yield
+            outcome = "success"
+        except RateLimitError:
+            outcome = "rate_limited"
+            raise
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                if outcome == "rate_limited" and admitted_epoch == self._epoch:
+                    self.limit = max(1, self.limit // 2)
+                    self._epoch += 1
+                    self._successes = 0
+                    logger.warning(f"Rate limited, reducing concurrency to {self.limit}")
+                elif outcome == "success":
+                    self._successes += 1
+                    if self._successes >= self.increase_after and self.limit < self.max_concurrency:
+                        self.limit += 1
+                        self._successes = 0
+                self._condition.notify_all()
+
 class TenKAnalyzer:
-    def __init__(self, api_key: str):
-        """Initialize the analyzer with DeepSeek API credentials."""
-        self.client = OpenAI(
+    # Sentence boundary: whitespace following terminal punctuation (kept with the sentence)
+    _SENT_RE = re.compile(r'(?<=[.!?])\s+')
+    _WS_RE = re.compile(r'\s+')
+
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrency: int = 8,
+        cache=None,
+        map_model: str = "deepseek-chat",
+        reduce_model: str = "deepseek-chat",
+        map_base_url: Optional[str] = None,
+        map_api_key: Optional[str] = None,
+    ):
+        """Initialize the analyzer with DeepSeek API credentials.
+        
+        `cache` is an optional diskcache.Cache (or anything with get/set) used to
+        reuse per-chunk analyses; boilerplate sections repeat across filings.
+        
+        The per-chunk map stage runs on `map_model` and the final reduce on
+        `reduce_model`, so a smaller, faster model can handle the many map calls.
+        Pass `map_base_url`/`map_api_key` to send the map stage to another
+        OpenAI-compatible provider; it then gets its own concurrency limiter.
+        """
+        self.client = AsyncOpenAI(
             api_key=api_key,
             base_url="https://api.deepseek.com/",
-            default_headers={"User-Agent": "TenKAnalyzer"}  # Add a user agent
+            default_headers={"User-Agent": "TenKAnalyzer"},  # Add a user agent
+            max_retries=0  # Retries are handled by _complete so the limiter sees every 429
         )
+        self.map_model = map_model
+        self.reduce_model = reduce_model
         # Initialize tokenizer for counting tokens
-        self.tokenizer = tiktoken.encoding_for_model("gpt-4")  # Using GPT-4 tokenizer as approximation
+        # GPT-4's cl100k_base tokenizer as an approximation; get_encoding skips the model lookup.
+        # Set TIKTOKEN_CACHE_DIR so workers load the BPE file from disk instead of downloading it.
+        self.tokenizer = tiktoken.get_encoding("cl100k_base")
         self.max_tokens = 8000  # Set conservative token limit for context window
+        self.max_concurrency = max_concurrency  # Cap on in-flight API calls to respect rate limits
+        self.limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+        if map_base_url:
+            self.map_client = AsyncOpenAI(
+                api_key=map_api_key,  # None falls back to OPENAI_API_KEY
+                base_url=map_base_url,
+                default_headers={"User-Agent": "TenKAnalyzer"},
+                max_retries=0
+            )
+            self.map_limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+        else:
+            self.map_client = self.client
+            self.map_limiter = self.limiter
+        self.cache = cache
+        # Chunk analyses depend only on the map stage, so switching the reduce model keeps them
+        self.chunk_cache_namespace = f"{ANALYSIS_CACHE_VERSION}:{map_model}:{map_base_url or ''}"
+        self.cache_namespace = f"{self.chunk_cache_namespace}:{reduce_model}"
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text content from a PDF file."""
+    def extract_pages_from_pdf(self, pdf_bytes: bytes) -> List[str]:
+        """Extract the text of each page of an in-memory PDF, in page order."""
         try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+                page_count = doc.page_count
+                # A single pool process would only add IPC on top of serial extraction
+                if page_count < PARALLEL_EXTRACTION_MIN_PAGES or EXTRACTION_MAX_WORKERS < 2:
+                    return [page.get_text("text") for page in doc]
+            
+            # Large filings: spread page layout parsing across cores
+            try:
+                return self._extract_pages_in_pool(pdf_bytes, page_count)
+            except BrokenProcessPool:
+                # A worker died (OOM kill, MuPDF crash); replace the pool and retry once
+                logger.warning("Extraction pool broke, recreating it and retrying")
+                _reset_extraction_pool()
+                return self._extract_pages_in_pool(pdf_bytes, page_count)
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
             raise
 
+    @staticmethod
+    def _extract_pages_in_pool(pdf_bytes: bytes, page_count: int) -> List[str]:
+        """Extract pages in the shared pool. Each task gets a contiguous page range so the
+        document is sent and opened once per task."""
+        step = -(-page_count // EXTRACTION_MAX_WORKERS)
+        pool = _get_extraction_pool()
+        futures = [
+            pool.submit(_extract_page_range, pdf_bytes, start, min(start + step, page_count))
+            for start in range(0, page_count, step)
+        ]
+        return [text for future in futures for text in future.result()]
+
+    def filter_boilerplate(self, pages: List[str]) -> List[str]:
+        """Drop filing boilerplate that costs LLM tokens without yielding insights.
+        
+        Removes running headers/footers, the signature block, and
+        pages that are mostly numbers or markup (XBRL tags, exhibit indexes).
+        """
+        page_lines = [[line.strip() for line in page.splitlines() if line.strip()] for page in pages]
+        
+        # Cut the signature block. The table of contents lists SIGNATURES too, so only the
+        # last occurrence is the real heading.
+        signature_hits = [
+            (page_index, line_index)
+            for page_index, lines in enumerate(page_lines)
+            for line_index, line in enumerate(lines)
+            if SIGNATURES_RE.match(line)
+        ]
+        if signature_hits:
+            page_index, line_index = signature_hits[-1]
+            signature_page = page_lines[page_index]
+            page_lines = (
+                page_lines[:page_index]
+                + [signature_page[:line_index]]
+                + self._after_signature_block(signature_page[line_index + 1:], page_lines[page_index + 1:])
+            )
+        
+        # Lines repeated on many pages are running headers/footers. On short documents the
+        # ratio would flag lines seen only once or twice, so skip it there.
+        repeated = set()
+        if len(page_lines) >= REPEATED_LINE_MIN_PAGES:
+            line_counts = Counter(line for lines in page_lines for line in set(lines))
+            threshold = REPEATED_LINE_PAGE_RATIO * len(page_lines)
+            repeated = {line for line, count in line_counts.items() if count >= 2 and count > threshold}
+        filtered = [[line for line in lines if line not in repeated] for lines in page_lines]
+        
+        kept = []
+        for lines in filtered:
+            page = "\n".join(lines)
+            chars = [c for c in page if not c.isspace()]
+            if chars and sum(c.isalpha() for c in chars) / len(chars) >= MIN_ALPHA_RATIO:
+                kept.append(page)
+        
+        logger.info(f"Boilerplate filter kept {len(kept)}/{len(pages)} pages")
+        return kept
+
+    @staticmethod
+    def _after_signature_block(rest_of_page: List[str], later_pages: List[List[str]]) -> List[List[str]]:
+        """Return what follows the signature block: everything from the next financial
+        statement or exhibit heading on. Nothing if no such heading follows."""
+        for line_index, line in enumerate(rest_of_page):
+            if SIGNATURE_BLOCK_END_RE.match(line):
+                return [rest_of_page[line_index:]] + later_pages
+        for page_index, lines in enumerate(later_pages):
+            # Headings like "F-1" are often page footers, so resume at the start of that page
+            if any(SIGNATURE_BLOCK_END_RE.match(line) for line in lines):
+                return later_pages[page_index:]
+        return []
+
     def preprocess_text(self, text: str) -> str:
         """Clean and preprocess the extracted text."""
-        # Remove multiple newlines
-        text = '\n'.join(line.strip() for line in text.split('\n') if line.strip())
-        # Remove multiple spaces
-        text = ' '.join(text.split())
-        return text
+        # Collapse all runs of whitespace (newlines included) in a single pass
+        return self._WS_RE.sub(' ', text).strip()
 
     def chunk_text(self, text: str) -> List[str]:
         """Split text into chunks that fit within the model's context window."""
         chunks = []
-        current_chunk = ""
-        current_tokens = 0
         
-        sentences = text.split('. ')
+        sentences = self._SENT_RE.split(text)
+        # Tokenize every sentence in one batched call instead of one call per sentence.
+        # The joining space is counted separately rather than concatenated onto every
+        # sentence, which would copy the whole document once more just to count tokens.
+        encodings = self.tokenizer.encode_ordinary_batch(sentences)
+        separator_tokens = len(self.tokenizer.encode_ordinary(' '))
         
-        for sentence in sentences:
-            sentence_tokens = len(self.tokenizer.encode(sentence + '. '))
-            
-            if current_tokens + sentence_tokens > self.max_tokens:
-                chunks.append(current_chunk)
-                current_chunk = sentence + '. '
-                current_tokens = sentence_tokens
-            else:
-                current_chunk += sentence + '. '
-                current_tokens += sentence_tokens
-        
-        if current_chunk:
-            chunks.append(current_chunk)
+        # cum[i] is the token count of sentences[:i], so a chunk spanning sentences[start:end]
+        # costs cum[end] - cum[start] and each boundary is a binary search
+        cum = np.zeros(len(sentences) + 1, dtype=np.int64)
+        np.cumsum([len(encoding) + separator_tokens for encoding in encodings], out=cum[1:])
+        
+        start = 0
+        while start < len(sentences):
+            end = int(np.searchsorted(cum, cum[start] + self.max_tokens, side='right')) - 1
+            # A single sentence over the budget still gets a chunk of its own
+            end = max(end, start + 1)
+            chunks.append(' '.join(sentences[start:end]))
+            start = end
             
         return chunks
 
-    def analyze_chunk(self, chunk: str) -> Dict:
-        """Analyze a chunk of text using DeepSeek-V3."""
-        try:
-            system_prompt = """You are a concise financial analyst expert. Analyze the following 10-K filing excerpt and provide the MOST critical insights in pure JSON format (do not wrap in markdown code blocks). Use this exact structure:
-{
-    "key_financial_metrics": [],
-    "risks_and_challenges": [],
-    "strategic_initiatives": [],
-    "significant_changes": []
-}
-
-Be extremely selective and concise. Each array should contain only 3-5 of the MOST important points as strings. Focus on high-level, material insights that would be most relevant to investors. Each point should be a single sentence. Do not include any markdown formatting or code blocks in your response."""
+    def deduplicate_chunks(self, chunks: List[str]) -> List[str]:
+        """Drop chunks that are near-duplicates of an earlier one.
+        
+        Safe-harbor and risk-factor recitals repeat across a filing; since consolidation
+        dedups insights anyway, re-analyzing a duplicate only costs an LLM call.
+        """
+        lsh = MinHashLSH(threshold=DUPLICATE_CHUNK_THRESHOLD, num_perm=MINHASH_NUM_PERM)
+        unique = []
+        for i, chunk in enumerate(chunks):
+            words = chunk.split()
+            shingles = {' '.join(words[j:j + 3]) for j in range(max(1, len(words) - 2))}
+            signature = MinHash(num_perm=MINHASH_NUM_PERM)
+            signature.update_batch(shingle.encode('utf-8') for shingle in shingles)
+            
+            if lsh.query(signature):
+                continue
+            lsh.insert(str(i), signature)
+            unique.append(chunk)
+        
+        if len(unique) < len(chunks):
+            logger.info(f"Skipping {len(chunks) - len(unique)} near-duplicate chunks")
+        return unique
 
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
+    @retry(
+        wait=wait_random_exponential(min=1, max=30),
+        stop=stop_after_attempt(6),
+        # APIConnectionError includes APITimeoutError; InternalServerError covers 5xx (e.g. 503 overloaded)
+        retry=retry_if_exception_type((RateLimitError, APIConnectionError, InternalServerError)),
+        reraise=True,
+    )
+    async def _complete(
+        self,
+        client: AsyncOpenAI,
+        limiter: AdaptiveConcurrencyLimiter,
+        model: str,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        """Run one chat completion under the given limiter, retrying transient API failures."""
+        async with limiter.slot():
+            response = await client.chat.completions.create(
+                model=model,
                 messages=[
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": chunk}
+                    {"role": "user", "content": user_content}
                 ],
+                # JSON mode guarantees parseable output, so no markdown stripping is needed
+                response_format={"type": "json_object"},
                 stream=False
             )
+        return response.choices[0].message.content
+
+    async def analyze_chunk(self, chunk: str) -> Dict:
+        """Analyze a chunk of text using the map model."""
+        try:
+            raw_content = await self._complete(
+                self.map_client, self.map_limiter, self.map_model, ANALYSIS_SYSTEM_PROMPT, chunk
+            )
             
             # Debug logging
-            raw_content = response.choices[0].message.content
             logger.debug(f"Raw API response content: {raw_content}")
             
-            # Clean up the response if it's wrapped in markdown code blocks
-            cleaned_content = raw_content
-            if cleaned_content.startswith('```json'):
-                cleaned_content = cleaned_content.replace('```json', '', 1)
-            if cleaned_content.endswith('```'):
-                cleaned_content = cleaned_content.rsplit('```', 1)[0]
-            cleaned_content = cleaned_content.strip()
-            
             try:
-                parsed_response = json.loads(cleaned_content)
+                parsed_response = orjson.loads(raw_content)
                 # Ensure we have all required keys with at least empty arrays
                 return {
                     "key_financial_metrics": parsed_response.get("key_financial_metrics", []),
@@ -116,8 +408,8 @@ Be extremely selective and concise. Each array should contain only 3-5 of the MO
                     "strategic_initiatives": parsed_response.get("strategic_initiatives", []),
                     "significant_changes": parsed_response.get("significant_changes", [])
                 }
-            except json.JSONDecodeError as je:
-                logger.error(f"Failed to parse JSON response: {cleaned_content}")
+            except orjson.JSONDecodeError as je:
+                logger.error(f"Failed to parse JSON response: {raw_content}")
                 # Return empty structure
                 return {
                     "key_financial_metrics": [],
@@ -137,6 +429,47 @@ Be extremely selective and concise. Each array should contain only 3-5 of the MO
                 "error": str(e)
             }
 
+    async def _reduce(self, analyses: List[Dict]) -> Tuple[Dict, bool]:
+        """Merge per-chunk analyses into the final report with a single LLM call.
+        
+        Falls back to the lexical consolidate_analyses if the call or parsing fails;
+        the returned flag is False in that case.
+        """
+        # Pool every distinct point per category; the map step keeps this small
+        pooled = {key: list(dict.fromkeys(self._string_points(analyses, key))) for key in ANALYSIS_KEYS}
+        if not any(pooled.values()):
+            return self.consolidate_analyses(analyses), True
+        
+        try:
+            raw_content = await self._complete(
+                self.client, self.limiter, self.reduce_model,
+                REDUCE_SYSTEM_PROMPT, orjson.dumps(pooled).decode("utf-8")
+            )
+            logger.debug(f"Raw reducer response content: {raw_content}")
+            parsed_response = orjson.loads(raw_content)
+            reduced = {key: parsed_response.get(key, []) for key in ANALYSIS_KEYS}
+            if not all(
+                isinstance(points, list) and all(isinstance(point, str) for point in points)
+                for points in reduced.values()
+            ):
+                raise ValueError("reducer returned non-string points")
+            if not any(reduced.values()):
+                raise ValueError("reducer returned no points for non-empty input")
+            return reduced, True
+        except Exception as e:
+            logger.error(f"Reducer call failed, falling back to lexical consolidation: {e}")
+            return self.consolidate_analyses(analyses), False
+
+    @staticmethod
+    def _string_points(analyses: List[Dict], key: str) -> List[str]:
+        """All points under `key`, skipping non-string items (e.g. objects the model returned)."""
+        points = []
+        for analysis in analyses:
+            values = analysis.get(key, [])
+            if isinstance(values, list):
+                points.extend(point for point in values if isinstance(point, str))
+        return points
+
     def consolidate_analyses(self, analyses: List[Dict]) -> Dict:
         """Consolidate analyses from multiple chunks into a single comprehensive report."""
         consolidated = {
@@ -146,49 +479,87 @@ Be extremely selective and concise. Each array should contain only 3-5 of the MO
             "significant_changes": []
         }
         
-        # Collect all unique insights
-        for analysis in analyses:
-            for key in consolidated.keys():
-                if key in analysis:
-                    consolidated[key].extend(analysis[key])
+        # Collect all insights
+        for key in consolidated.keys():
+            consolidated[key].extend(self._string_points(analyses, key))
         
-        # Remove duplicates while preserving order
+        # Remove duplicates, then keep the 10 most concise points (to prioritize brevity)
         for key in consolidated.keys():
-            # Remove duplicates
-            consolidated[key] = list(dict.fromkeys(consolidated[key]))
-            
-            # Sort by length (to prioritize more concise points) and take top 10
-            consolidated[key] = sorted(consolidated[key], key=len)[:10]
-            
-            # Ensure we don't have more than 5 points per category
-            if len(consolidated[key]) > 10:
-                consolidated[key] = consolidated[key][:7]
+            consolidated[key] = heapq.nsmallest(10, dict.fromkeys(consolidated[key]), key=len)
         
         return consolidated
 
-    def analyze_10k(self, pdf_path: str) -> Dict:
-        """Main function to analyze a 10-K filing."""
-        logger.info(f"Starting analysis of {pdf_path}")
+    async def _analyze_with_cache(self, index: int, total: int, chunk: str) -> Dict:
+        """Analyze a chunk, reusing a cached analysis when available."""
+        cache_key = self._chunk_cache_key(chunk)
+        # diskcache is blocking SQLite I/O shared between server workers, so keep it off the loop
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"Chunk {index+1}/{total} served from cache")
+                return cached
         
-        # Extract and preprocess text
-        text = self.extract_text_from_pdf(pdf_path)
+        logger.info(f"Analyzing chunk {index+1}/{total}")
+        analysis = await self.analyze_chunk(chunk)
+        
+        # Only cache clean results so failed calls are retried next time
+        if self.cache is not None and "error" not in analysis and "raw_response" not in analysis:
+            await asyncio.to_thread(self.cache.set, cache_key, analysis, expire=CACHE_TTL_SECONDS)
+        return analysis
+
+    def _chunk_cache_key(self, chunk: str) -> str:
+        """Cache key for a chunk analysis, tied to the prompt version and map model."""
+        digest = hashlib.sha256(f"{self.chunk_cache_namespace}\n{chunk}".encode("utf-8")).hexdigest()
+        return f"chunk:{digest}"
+
+    def prepare_chunks(self, pdf_bytes: bytes) -> List[str]:
+        """Extract, clean and chunk a PDF. CPU-bound, so analyze_10k runs it off the event loop."""
+        # Extract, drop boilerplate and preprocess text
+        pages = self.extract_pages_from_pdf(pdf_bytes)
+        pages = self.filter_boilerplate(pages)
+        text = "\n".join(pages)
         text = self.preprocess_text(text)
+        if not text:
+            return []
         
         # Split into chunks
         chunks = self.chunk_text(text)
         logger.info(f"Split document into {len(chunks)} chunks")
+        return self.deduplicate_chunks(chunks)
+
+    async def analyze_10k(self, pdf_bytes: bytes) -> Tuple[Dict, bool]:
+        """Main function to analyze a 10-K filing given the raw PDF bytes.
+        
+        Returns the report and whether every chunk and the reduce step succeeded,
+        so callers can avoid caching a degraded report.
+        """
+        logger.info(f"Starting analysis of {len(pdf_bytes)} byte PDF")
+        
+        # Keep the event loop free for other requests' LLM calls while parsing
+        chunks = await asyncio.to_thread(self.prepare_chunks, pdf_bytes)
+        if not chunks:
+            logger.info("No text left after filtering, skipping analysis")
+            return {key: [] for key in ANALYSIS_KEYS}, True
+        
+        # Analyze all chunks concurrently; the shared limiter bounds in-flight API calls
+        tasks = [self._analyze_with_cache(i, len(chunks), chunk) for i, chunk in enumerate(chunks)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Analyze each chunk
         analyses = []
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Analyzing chunk {i+1}/{len(chunks)}")
-            analysis = self.analyze_chunk(chunk)
-            analyses.append(analysis)
+        complete = True
+        for i, result in enumerate(results):
+            if isinstance(result, BaseException):
+                logger.error(f"Chunk {i+1} failed: {result}")
+                complete = False
+                continue
+            if "error" in result or "raw_response" in result:
+                complete = False
+            analyses.append(result)
         
         # Consolidate analyses
-        final_analysis = self.consolidate_analyses(analyses)
+        final_analysis, reduced = await self._reduce(analyses)
         
-        return final_analysis
+        return final_analysis, complete and reduced
 
 def main():
     # Example usage
@@ -200,11 +571,13 @@ def main():
     
     # Example analysis
     pdf_path = "/Users/dhrubhagatsingh/Desktop/10kproject/backend/coinbase.pdf"
-    analysis = analyzer.analyze_10k(pdf_path)
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+    analysis, _ = asyncio.run(analyzer.analyze_10k(pdf_bytes))
     
     # Save results
-    with open("10k_analysis.json", "w") as f:
-        json.dump(analysis, f, indent=4)
+    with open("10k_analysis.json", "wb") as f:
+        f.write(orjson.dumps(analysis, option=orjson.OPT_INDENT_2))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file